@@ -11,13 +11,13 @@ Please be careful: the given storage will be created, used and **completely dele
 
 
 def run_demo(storage_url):
+    from hashlib import sha256
     from .store import Store
 
     def id_key(data: bytes):
-        from hashlib import new
-
-        h = new("sha256", data)
-        return f"data/{h.hexdigest()}"
+        # the named constructor avoids the per-call name lookup of hashlib.new("sha256", ...),
+        # both use the same (usually OpenSSL) implementation.
+        return f"data/{sha256(data).hexdigest()}"
 
     levels_config = {
         "config/": [0],  # no nesting needed/wanted for the configs
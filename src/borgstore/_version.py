@@ -0,0 +1 @@
+__version__ = version = '0.1.dev1+gdfe025a9c'
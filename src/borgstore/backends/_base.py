@@ -6,24 +6,26 @@ Docs that are not backend-specific are also found here.
 
 from abc import ABC, abstractmethod
 from collections import namedtuple
-from typing import Iterator
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
 
+from .errors import BackendMustBeOpen
 from ..constants import MAX_NAME_LENGTH
 
+# note: for code creating many ItemInfo instances, ItemInfo._make(tuple) and positional args are much
+# quicker than keyword args.
 ItemInfo = namedtuple("ItemInfo", "name exists size directory")
 
 
-def validate_name(name):
+def _validate_name(name):
     """validate a backend key / name"""
     if not isinstance(name, str):
         raise TypeError(f"name must be str, but got: {type(name)}")
     # name must not be too long
     if len(name) > MAX_NAME_LENGTH:
         raise ValueError(f"name is too long (max: {MAX_NAME_LENGTH}): {name}")
-    # avoid encoding issues
-    try:
-        name.encode("ascii")
-    except UnicodeEncodeError:
+    # avoid encoding issues (isascii is cheap, it does not need to encode or even scan the str)
+    if not name.isascii():
         raise ValueError(f"name must encode to plain ascii, but failed with: {name}")
     # security: name must be relative - can be foo or foo/bar/baz, but must never be /foo or ../foo
     if name.startswith("/") or name.endswith("/") or ".." in name:
@@ -40,6 +42,12 @@ def validate_name(name):
         raise ValueError(f"name must be lowercase, but got: {name}")
 
 
+# same names get validated again and again (e.g. namespaces, repeatedly accessed keys), so we cache the
+# results for the names validated most recently. invalid names raise an exception and are never cached.
+# validate_name.cache_info() shows how well the cache works.
+validate_name = lru_cache(maxsize=8192)(_validate_name)
+
+
 class BackendBase(ABC):
     # a backend can request all directories to be pre-created once at backend creation (initialization) time.
     # for some backends this will optimize the performance of store and move operation, because they won't
@@ -80,6 +88,25 @@ class BackendBase(ABC):
     def mkdir(self, name: str) -> None:
         """create directory/namespace <name>"""
 
+    @staticmethod
+    def _map_concurrently(executor, fn: Callable, iterable: Iterable) -> list:
+        """call fn for each item of <iterable> using the <executor> thread pool, return the results in order
+
+        This is the shared implementation for backends overriding the *_many methods with concurrent ones.
+        The first exception raised by fn is re-raised here, calls that did not start yet are cancelled then.
+        """
+        if executor is None:
+            raise BackendMustBeOpen()
+        return list(executor.map(fn, iterable))
+
+    def mkdir_many(self, names: Iterable[str]) -> None:
+        """create directories/namespaces <names>
+
+        Backends may override this with an implementation that is more efficient than creating one by one.
+        """
+        for name in names:
+            self.mkdir(name)
+
     @abstractmethod
     def rmdir(self, name: str) -> None:
         """remove directory/namespace <name>"""
@@ -88,18 +115,48 @@ class BackendBase(ABC):
     def info(self, name) -> ItemInfo:
         """return information about <name>"""
 
+    def exists(self, name: str) -> bool:
+        """return whether <name> exists
+
+        Backends may override this with an implementation that is more efficient than .info(name).exists.
+        """
+        return self.info(name).exists
+
     @abstractmethod
     def load(self, name: str, *, size=None, offset=0) -> bytes:
         """load value from <name>"""
 
+    def load_many(self, names: Iterable[str]) -> dict[str, bytes]:
+        """load values from <names>, return a dict name -> value
+
+        Backends may override this with an implementation that is more efficient than loading one by one.
+        """
+        return {name: self.load(name) for name in names}
+
     @abstractmethod
     def store(self, name: str, value: bytes) -> None:
         """store <value> into <name>"""
 
+    def store_many(self, items: Iterable[tuple[str, bytes]]) -> None:
+        """store (<name>, <value>) <items>
+
+        Backends may override this with an implementation that is more efficient than storing one by one.
+        """
+        for name, value in items:
+            self.store(name, value)
+
     @abstractmethod
     def delete(self, name: str) -> None:
         """delete <name>"""
 
+    def delete_many(self, names: Iterable[str]) -> None:
+        """delete <names>
+
+        Backends may override this with an implementation that is more efficient than deleting one by one.
+        """
+        for name in names:
+            self.delete(name)
+
     @abstractmethod
     def move(self, curr_name: str, new_name: str) -> None:
         """rename curr_name to new_name (overwrite target)"""
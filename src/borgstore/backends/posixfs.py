@@ -2,18 +2,66 @@
 Filesystem based backend implementation - uses files in directories below a base path.
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import itertools
 import os
-import re
 from pathlib import Path
 import shutil
 import stat
-import tempfile
+import threading
 
 from ._base import BackendBase, ItemInfo, validate_name
 from .errors import BackendError, BackendAlreadyExists, BackendDoesNotExist, BackendMustNotBeOpen, BackendMustBeOpen
 from .errors import ObjectNotFound
 from ..constants import TMP_SUFFIX
 
+# pid and counter are used to create unique names for temporary files
+_pid = os.getpid()
+_tmp_counter = itertools.count()
+
+# O_DSYNC is not available on all platforms, 0 means we need to fsync
+O_DSYNC = getattr(os, "O_DSYNC", 0)
+
+# O_TMPFILE (unnamed temporary files) is only available on linux, 0 means not available
+O_TMPFILE = getattr(os, "O_TMPFILE", 0)
+
+# buffer size for copying file contents in user space (if the kernel can't do it for us)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _reset_tmp_names():
+    """a forked child process has another pid, start over with the counter"""
+    global _pid, _tmp_counter
+    _pid = os.getpid()
+    _tmp_counter = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_tmp_names)
+
+
+def _tmp_names(path):
+    """generate names for a temporary file for <path>"""
+    # pid + counter give a unique name without needing random names (like the tempfile module).
+    while True:
+        yield f"{path}.{_pid}.{next(_tmp_counter)}{TMP_SUFFIX}"
+
+
+def _pread(fd, size, offset):
+    """read <size> bytes at <offset> from fd, less only if the end of the file is reached"""
+    parts = []
+    while size > 0:
+        data = os.pread(fd, size, offset)
+        if not data:
+            break  # EOF
+        # usually, we get all we wanted with the first pread, but it might be less (e.g. for huge sizes).
+        parts.append(data)
+        size -= len(data)
+        offset += len(data)
+    return b"".join(parts)  # no copy if there is only one part
+
 
 def get_file_backend(url):
     # file:///absolute/path
@@ -25,25 +73,36 @@ def get_file_backend(url):
     # - the third slash is NOT optional, it is the start of an absolute path as well
     #   as the separator between the host and the path part.
     # - the caller is responsible to give an absolute path.
-    file_regex = r"""
-        file://  # only empty host part is supported
-        (?P<path>(/.*))  # path must be an absolute path
-    """
-    m = re.match(file_regex, url, re.VERBOSE)
-    if m:
-        return PosixFS(path=m["path"])
+    # - this is simple enough to not need a regex: only empty host part is supported, path must be absolute.
+    if url.startswith("file:///"):
+        return PosixFS(path=url[len("file://") :])
 
 
 class PosixFS(BackendBase):
     # PosixFS implementation supports precreate = True as well as = False.
     precreate_dirs: bool = False
 
-    def __init__(self, path, *, do_fsync=False):
+    def __init__(self, path, *, do_fsync=False, fadvise_threshold=None, info_cache_size=0):
         self.base_path = Path(path)
         if not self.base_path.is_absolute():
             raise BackendError("path must be an absolute path")
+        self._base_str = os.fspath(self.base_path)
         self.opened = False
+        self.executor = None  # thread pool for the *_many methods, only exists while opened
         self.do_fsync = do_fsync  # False = 26x faster, see #10
+        self.use_o_tmpfile = False  # determined by open, see _o_tmpfile_works
+        # if values of at least this size are usually read / written only once, we can advise the kernel to not
+        # keep them in the page cache (and evict other, more useful data instead). this only happens for full
+        # loads and for stores with do_fsync. None (default) disables this, because it also drops pages other
+        # processes might still use and values that are loaded repeatedly (e.g. borg's index / cache objects).
+        self.fadvise_threshold = fadvise_threshold if hasattr(os, "posix_fadvise") else None
+        # LRU cache name -> ItemInfo for existing items, so that repeated info / exists calls do not need to
+        # hit the filesystem. we invalidate it for our own changes, but changes done by other processes (or by
+        # other PosixFS instances) will NOT be noticed while an entry is cached. thus, this is only safe if
+        # nobody else modifies the storage while it is opened, so it is disabled (0) by default.
+        self.info_cache_size = info_cache_size
+        self._info_cache = OrderedDict()
+        self._info_cache_lock = threading.Lock()  # the *_many methods use multiple threads
 
     def create(self):
         if self.opened:
@@ -72,101 +131,281 @@ class PosixFS(BackendBase):
             raise BackendDoesNotExist(
                 f"posixfs storage base path does not exist or is not a directory: {self.base_path}"
             )
+        self.use_o_tmpfile = self._o_tmpfile_works()
+        self.executor = ThreadPoolExecutor(thread_name_prefix="posixfs")
         self.opened = True
 
+    def _o_tmpfile_works(self):
+        """check once whether we can create unnamed temporary files and link them into the storage"""
+        # O_TMPFILE: linux >= 3.11 and fs support needed (e.g. ext4, xfs, btrfs, tmpfs).
+        # we need /proc to give the unnamed temporary file its final name, and that might not work either
+        # (e.g. EXDEV in some containers), so we just try it.
+        if not O_TMPFILE:
+            return False
+        try:
+            fd = os.open(self._base_str, os.O_WRONLY | O_TMPFILE, 0o600)
+        except OSError:
+            return False
+        try:
+            tmp_path = next(_tmp_names(os.path.join(self._base_str, "probe")))
+            os.link(f"/proc/self/fd/{fd}", tmp_path, follow_symlinks=True)
+        except OSError:
+            return False
+        else:
+            os.unlink(tmp_path)
+            return True
+        finally:
+            os.close(fd)
+
     def close(self):
         if not self.opened:
             raise BackendMustBeOpen()
+        self.executor.shutdown()
+        self.executor = None
+        self._info_cache_clear()
         self.opened = False
 
+    def _info_cache_get(self, name):
+        with self._info_cache_lock:
+            info = self._info_cache.get(name)
+            if info is not None:
+                self._info_cache.move_to_end(name)
+            return info
+
+    def _info_cache_put(self, name, info):
+        with self._info_cache_lock:
+            self._info_cache[name] = info
+            self._info_cache.move_to_end(name)
+            if len(self._info_cache) > self.info_cache_size:
+                self._info_cache.popitem(last=False)
+
+    def _info_cache_discard(self, *names):
+        if self.info_cache_size:
+            with self._info_cache_lock:
+                for name in names:
+                    self._info_cache.pop(name, None)
+
+    def _info_cache_clear(self):
+        with self._info_cache_lock:
+            self._info_cache.clear()
+
     def _validate_join(self, name):
         validate_name(name)
-        return self.base_path / name
+        # name is a validated, relative, "/"-separated path, so simple str concatenation is safe here.
+        # not using pathlib for this is much faster and we need a str for the os.* functions anyway.
+        return f"{self._base_str}/{name}" if name else self._base_str
 
     def mkdir(self, name):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
-        path.mkdir(parents=True, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
 
     def rmdir(self, name):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
         try:
-            path.rmdir()
+            os.rmdir(path)
         except FileNotFoundError:
             raise ObjectNotFound(name) from None
+        finally:
+            self._info_cache_discard(name)
 
     def info(self, name):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
+        if self.info_cache_size:
+            info = self._info_cache_get(name)
+            if info is not None:
+                return info
         try:
-            st = path.stat()
+            st = os.stat(path)
         except FileNotFoundError:
-            return ItemInfo(name=path.name, exists=False, directory=False, size=0)
+            return ItemInfo(name=os.path.basename(path), exists=False, directory=False, size=0)
         else:
             is_dir = stat.S_ISDIR(st.st_mode)
-            return ItemInfo(name=path.name, exists=True, directory=is_dir, size=st.st_size)
+            info = ItemInfo(name=os.path.basename(path), exists=True, directory=is_dir, size=st.st_size)
+            if self.info_cache_size:
+                self._info_cache_put(name, info)
+            return info
+
+    def exists(self, name):
+        if not self.opened:
+            raise BackendMustBeOpen()
+        path = self._validate_join(name)
+        if self.info_cache_size and self._info_cache_get(name) is not None:
+            return True
+        # cheaper than os.stat: no stat_result object and no exception if it does not exist.
+        return os.access(path, os.F_OK)
 
     def load(self, name, *, size=None, offset=0):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
         try:
-            with path.open("rb") as f:
-                if offset > 0:
-                    f.seek(offset)
-                return f.read(-1 if size is None else size)
+            fd = os.open(path, os.O_RDONLY)
         except FileNotFoundError:
             raise ObjectNotFound(name) from None
+        try:
+            # only full loads are considered "read once", partial loads usually read headers again and again.
+            fadvise = size is None and self.fadvise_threshold is not None
+            st = os.fstat(fd)
+            if stat.S_ISDIR(st.st_mode):
+                # opening a directory read-only works, but reading it must fail (pread might not, e.g. if size == 0).
+                raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+            if size is None:
+                size = max(st.st_size - offset, 0)  # everything from offset to the end of the file
+            if fadvise and size >= self.fadvise_threshold:
+                os.posix_fadvise(fd, offset, size, os.POSIX_FADV_SEQUENTIAL)
+            # no buffered file object, no seek: pread reads at the offset with a single syscall.
+            data = _pread(fd, size, offset)
+            if fadvise and len(data) >= self.fadvise_threshold:
+                os.posix_fadvise(fd, offset, len(data), os.POSIX_FADV_DONTNEED)
+            return data
+        finally:
+            os.close(fd)
 
-    def store(self, name, value):
-        def _write_to_tmpfile():
-            with tempfile.NamedTemporaryFile(suffix=TMP_SUFFIX, dir=tmp_dir, delete=False) as f:
-                f.write(value)
-                if self.do_fsync:
-                    f.flush()
-                    os.fsync(f.fileno())
-                tmp_path = Path(f.name)
-            return tmp_path
+    def load_many(self, names):
+        # the os calls release the GIL, so we can have multiple I/O operations in flight.
+        names = list(names)
+        return dict(zip(names, self._map_concurrently(self.executor, self.load, names)))
 
-        if not self.opened:
-            raise BackendMustBeOpen()
-        path = self._validate_join(name)
-        tmp_dir = path.parent
-        # write to a differently named temp file in same directory first,
-        # so the store never sees partially written data.
+    def _write_file(self, path, write_data, size, *, dsync=False):
+        """write a file at <path> by calling write_data(fd), which writes <size> bytes to (empty) fd
+
+        if dsync is True, write_data must only use os.write to write the data. then, if do_fsync is enabled,
+        the file is opened with O_DSYNC (if available) instead of calling fsync after writing.
+        """
+
+        def _write_fd(fd):
+            write_data(fd)
+            if self.do_fsync and not open_flags & O_DSYNC:
+                os.fsync(fd)
+            # without fsync, the pages are still dirty here and DONTNEED would only start writeback (in our
+            # thread, on the hot path) without evicting them, so this only helps after the data is on disk.
+            if self.do_fsync and self.fadvise_threshold is not None and size >= self.fadvise_threshold:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+        def _rename_to_final_name(tmp_path):
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+
+        def _write_unnamed_tmpfile():
+            # the file does not have a name while we write to it, so nobody can see partially written data.
+            # it also can't be left behind as a temporary file if we crash.
+            # returns False if the fs does not support this (nothing was written then).
+            try:
+                fd = os.open(tmp_dir, os.O_WRONLY | O_TMPFILE | open_flags, 0o600)
+            except OSError as err:
+                if err.errno in (errno.EOPNOTSUPP, errno.EISDIR, errno.EINVAL):
+                    return False
+                raise
+            try:
+                _write_fd(fd)
+                # all written and synced to disk, give it the final name:
+                fd_path = f"/proc/self/fd/{fd}"
+                try:
+                    os.link(fd_path, path, follow_symlinks=True)
+                except FileExistsError:
+                    # someone else created the file meanwhile, but link can't overwrite it. thus, link to a
+                    # temporary name first and then rename that to the final name.
+                    for tmp_path in _tmp_names(path):
+                        try:
+                            os.link(fd_path, tmp_path, follow_symlinks=True)
+                            break
+                        except FileExistsError:
+                            pass
+                    _rename_to_final_name(tmp_path)
+            finally:
+                os.close(fd)
+            return True
+
+        def _write_named_tmpfile():
+            # write to a differently named temp file in same directory first,
+            # so the store never sees partially written data.
+            for tmp_path in _tmp_names(path):
+                try:
+                    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | open_flags, 0o600)
+                    break
+                except FileExistsError:
+                    pass  # likely a leftover from a crashed process that had the same pid, try next name.
+            try:
+                try:
+                    _write_fd(fd)
+                finally:
+                    os.close(fd)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            # all written and synced to disk, rename it to the final name:
+            _rename_to_final_name(tmp_path)
+
+        def _write():
+            # overwriting an existing file is cheaper with a named temporary file (no link to a temporary name).
+            if self.use_o_tmpfile and not os.access(path, os.F_OK):
+                if _write_unnamed_tmpfile():
+                    return
+                self.use_o_tmpfile = False  # not supported by the fs, do not try again.
+            _write_named_tmpfile()
+
+        # with O_DSYNC, each write returns only after the data (and the metadata needed to read it) is on disk,
+        # so we save the extra fsync syscall and disk round-trip. copy_file_range might bypass this, thus opt-in.
+        open_flags = O_DSYNC if dsync and self.do_fsync else 0
+        tmp_dir = os.path.dirname(path)
         try:
             # try to do it quickly, not doing the mkdir. fs ops might be slow, esp. on network fs (latency).
             # this will frequently succeed, because the dir is already there.
-            tmp_path = _write_to_tmpfile()
+            _write()
         except FileNotFoundError:
             # retry, create potentially missing dirs first. this covers these cases:
             # - either the dirs were not precreated
             # - a previously existing directory was "lost" in the filesystem
-            tmp_dir.mkdir(parents=True, exist_ok=True)
-            tmp_path = _write_to_tmpfile()
-        # all written and synced to disk, rename it to the final name:
+            os.makedirs(tmp_dir, exist_ok=True)
+            _write()
+
+    def store(self, name, value):
+        def _write_value(fd):
+            # write value (bytes or any other buffer, like bytearray or mmap) without copying it.
+            written = os.write(fd, value)
+            if written < len(value):
+                # os.write might do partial writes. slicing a memoryview does not copy the rest of the data.
+                with memoryview(value) as view:
+                    while written < len(value):
+                        written += os.write(fd, view[written:])
+
+        if not self.opened:
+            raise BackendMustBeOpen()
+        path = self._validate_join(name)
         try:
-            tmp_path.replace(path)
-        except OSError:
-            tmp_path.unlink()
-            raise
+            self._write_file(path, _write_value, len(value), dsync=True)
+        finally:
+            self._info_cache_discard(name)
 
     def delete(self, name):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
         try:
-            path.unlink()
+            os.unlink(path)
         except FileNotFoundError:
             raise ObjectNotFound(name) from None
+        finally:
+            self._info_cache_discard(name)
+
+    def store_many(self, items):
+        self._map_concurrently(self.executor, lambda item: self.store(*item), items)
+
+    def delete_many(self, names):
+        self._map_concurrently(self.executor, self.delete, names)
 
     def move(self, curr_name, new_name):
         def _rename_to_new_name():
-            curr_path.rename(new_path)
+            os.rename(curr_path, new_path)
 
         if not self.opened:
             raise BackendMustBeOpen()
@@ -180,27 +419,81 @@ class PosixFS(BackendBase):
             # retry, create potentially missing dirs first. this covers these cases:
             # - either the dirs were not precreated
             # - a previously existing directory was "lost" in the filesystem
-            new_path.parent.mkdir(parents=True, exist_ok=True)
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
             try:
                 _rename_to_new_name()
             except FileNotFoundError:
                 raise ObjectNotFound(curr_name) from None
+        finally:
+            if self.info_cache_size:
+                if os.path.isdir(new_path):
+                    # cached entries of items below a moved directory would be outdated now.
+                    self._info_cache_clear()
+                else:
+                    self._info_cache_discard(curr_name, new_name)
+
+    def copy(self, curr_name, new_name):
+        """copy curr_name to new_name (overwrite target)"""
+
+        def _copy_data(fd):
+            # note: we use explicit source offsets, so this can be called again for a retry.
+            offset = 0
+            if hasattr(os, "copy_file_range"):
+                # copy within the kernel, the data does not need to go through user space.
+                # on some filesystems (e.g. btrfs, xfs, nfs >= 4.2), this does not even need to copy the data.
+                try:
+                    while offset < size:
+                        copied = os.copy_file_range(src_fd, fd, size - offset, offset)
+                        if copied == 0:
+                            break
+                        offset += copied
+                except OSError as err:
+                    # not supported between these files / on this fs / kernel, fall back to read / write
+                    if err.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+            while offset < size:
+                data = os.pread(src_fd, min(size - offset, COPY_BUFFER_SIZE), offset)
+                if not data:
+                    break
+                offset += len(data)
+                while data:
+                    data = data[os.write(fd, data) :]
+
+        if not self.opened:
+            raise BackendMustBeOpen()
+        curr_path = self._validate_join(curr_name)
+        new_path = self._validate_join(new_name)
+        try:
+            src_fd = os.open(curr_path, os.O_RDONLY)
+        except FileNotFoundError:
+            raise ObjectNotFound(curr_name) from None
+        try:
+            size = os.fstat(src_fd).st_size
+            self._write_file(new_path, _copy_data, size)
+        finally:
+            os.close(src_fd)
+            self._info_cache_discard(new_name)
 
     def list(self, name):
         if not self.opened:
             raise BackendMustBeOpen()
         path = self._validate_join(name)
         try:
-            paths = sorted(path.iterdir())
+            with os.scandir(path) as it:
+                # filter out temp files before sorting, so we do not sort what we will not yield anyway.
+                entries = [e for e in it if not e.name.endswith(TMP_SUFFIX)]
         except FileNotFoundError:
             raise ObjectNotFound(name) from None
         else:
-            for p in paths:
-                if not p.name.endswith(TMP_SUFFIX):
-                    try:
-                        st = p.stat()
-                    except FileNotFoundError:
-                        pass
-                    else:
-                        is_dir = stat.S_ISDIR(st.st_mode)
-                        yield ItemInfo(name=p.name, exists=True, size=st.st_size, directory=is_dir)
+            entries.sort(key=lambda e: e.name)
+            make_item_info = ItemInfo._make
+            for e in entries:
+                try:
+                    # we need the size, so a stat syscall per item is unavoidable.
+                    # but DirEntry caches the result and we do not need to build the full path for it.
+                    st = e.stat()
+                except FileNotFoundError:
+                    pass
+                else:
+                    is_dir = stat.S_ISDIR(st.st_mode)
+                    yield make_item_info((e.name, True, st.st_size, is_dir))  # name, exists, size, directory
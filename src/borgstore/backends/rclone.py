@@ -2,15 +2,21 @@
 Borgstore backend for rclone
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import os
 import re
 import requests
 import subprocess
 import json
 import secrets
-from typing import Iterator
+from typing import Iterable, Iterator
 import threading
 
+try:
+    import orjson  # optional, much faster than the stdlib json module
+except ImportError:
+    orjson = None
+
 from ._base import BackendBase, ItemInfo, validate_name
 from .errors import (
     BackendError,
@@ -25,6 +31,16 @@ from ..constants import TMP_SUFFIX
 # rclone binary - expected to be on the path
 RCLONE = "rclone"
 
+# compiled once, not for each call
+_URL_RE = re.compile(
+    r"""
+        rclone:
+        (?P<path>(.*))
+    """,
+    re.VERBOSE,
+)
+_RCD_URL_RE = re.compile(rb"(http://.*/)")  # rclone rcd logs the URL it listens on
+
 # Debug HTTP requests and responses
 if False:
     import logging
@@ -43,6 +59,9 @@ def get_rclone_backend(url):
     rclone:remote:
     rclone:remote:path
     """
+    m = _URL_RE.match(url)
+    if not m:
+        return None  # not a rclone URL, no need to check the rclone binary.
     # Check rclone is on the path
     try:
         info = json.loads(subprocess.check_output([RCLONE, "rc", "--loopback", "core/version"]))
@@ -50,13 +69,7 @@ def get_rclone_backend(url):
         raise BackendDoesNotExist("rclone binary not found on the path or not working properly")
     if info["decomposed"] < [1, 57, 0]:
         raise BackendDoesNotExist(f"rclone binary too old - need at least version v1.57.0 - found {info['version']}")
-    rclone_regex = r"""
-        rclone:
-        (?P<path>(.*))
-    """
-    m = re.match(rclone_regex, url, re.VERBOSE)
-    if m:
-        return Rclone(path=m["path"])
+    return Rclone(path=m["path"])
 
 
 class Rclone(BackendBase):
@@ -68,6 +81,7 @@ class Rclone(BackendBase):
     precreate_dirs: bool = False
     HOST = "localhost"
     TRIES = 3  # try failed load/store operations this many times
+    WORKERS = 16  # run this many requests concurrently in the *_many methods
 
     def __init__(self, path, *, do_fsync=False):
         if not path.endswith(":") and not path.endswith("/"):
@@ -75,6 +89,8 @@ class Rclone(BackendBase):
         self.fs = path
         self.process = None
         self.url = None
+        self.session = None
+        self.executor = None  # thread pool for the *_many methods, only exists while opened
         self.user = "borg"
         self.password = secrets.token_urlsafe(32)
 
@@ -102,10 +118,17 @@ class Rclone(BackendBase):
         )
         # Read the log line with the port in it
         line = self.process.stderr.readline()
-        m = re.search(rb"(http://.*/)", line)
+        m = _RCD_URL_RE.search(line)
         if not m:
             raise BackendDoesNotExist(f"rclone rcd did not return URL in log line: {line}")
         self.url = m.group(1).decode("utf-8")
+        # a session keeps the connection to rclone rcd alive, so we do not need a new one for each request.
+        self.session = requests.Session()
+        self.session.auth = (self.user, self.password)
+        # rclone rcd handles concurrent requests, the pool must be big enough to keep all connections alive.
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.WORKERS)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.WORKERS, thread_name_prefix="rclone")
 
         def discard():
             """discard log output on stderr so we don't block the process"""
@@ -126,12 +149,16 @@ class Rclone(BackendBase):
         self.process.terminate()
         self.process = None
         self.url = None
+        self.executor.shutdown()
+        self.executor = None
+        self.session.close()
+        self.session = None
 
-    def _requests(self, fn, *args, tries=1, **kwargs):
+    def _requests(self, method, *args, tries=1, **kwargs):
         """
-        Runs a call to the requests function fn with *args and **kwargs
+        Runs a call to the requests session method (e.g. "get") with *args and **kwargs
 
-        It adds auth and decodes errors in a consistent way
+        The session adds auth, this decodes errors in a consistent way
 
         It returns the response object
 
@@ -143,8 +170,9 @@ class Rclone(BackendBase):
         """
         if not self.process or not self.url:
             raise BackendMustBeOpen()
+        fn = getattr(self.session, method)
         for try_number in range(tries):
-            r = fn(*args, auth=(self.user, self.password), **kwargs)
+            r = fn(*args, **kwargs)
             if r.status_code in (200, 206):
                 return r
             elif r.status_code == 404:
@@ -162,8 +190,14 @@ class Rclone(BackendBase):
         """
         if not self.url:
             raise BackendMustBeOpen()
-        r = self._requests(requests.post, self.url + command, json=json_input, **kwargs)
-        return r.json()
+        if orjson is None:
+            r = self._requests("post", self.url + command, json=json_input, **kwargs)
+            return r.json()
+        if json_input is not None:
+            kwargs["data"] = orjson.dumps(json_input)
+            kwargs["headers"] = {"Content-Type": "application/json"}
+        r = self._requests("post", self.url + command, **kwargs)
+        return orjson.loads(r.content)
 
     def create(self):
         """create (initialize) the rclone storage"""
@@ -200,6 +234,10 @@ class Rclone(BackendBase):
         validate_name(name)
         self._rpc("operations/mkdir", {"fs": self.fs, "remote": name})
 
+    def mkdir_many(self, names: Iterable[str]) -> None:
+        """create directories/namespaces <names>, doing multiple requests concurrently"""
+        self._map_concurrently(self.executor, self.mkdir, names)
+
     def rmdir(self, name: str) -> None:
         """remove directory/namespace <name>"""
         validate_name(name)
@@ -230,13 +268,15 @@ class Rclone(BackendBase):
     def load(self, name: str, *, size=None, offset=0) -> bytes:
         """load value from <name>"""
         validate_name(name)
-        headers = {}
+        # the stored values are usually compressed already, so we do not want the server to compress them
+        # (again) and requests / urllib3 to decompress them.
+        headers = {"Accept-Encoding": "identity"}
         if size is not None or offset > 0:
             if size is not None:
                 headers["Range"] = f"bytes={offset}-{offset+size-1}"
             else:
                 headers["Range"] = f"bytes={offset}-"
-        r = self._requests(requests.get, f"{self.url}[{self.fs}]/{name}", tries=self.TRIES, headers=headers)
+        r = self._requests("get", f"{self.url}[{self.fs}]/{name}", tries=self.TRIES, headers=headers)
         return r.content
 
     def store(self, name: str, value: bytes) -> None:
@@ -251,6 +291,19 @@ class Rclone(BackendBase):
         validate_name(name)
         self._rpc("operations/deletefile", {"fs": self.fs, "remote": name})
 
+    def load_many(self, names: Iterable[str]) -> dict[str, bytes]:
+        """load the values of all <names>, doing multiple requests concurrently"""
+        names = list(names)
+        return dict(zip(names, self._map_concurrently(self.executor, self.load, names)))
+
+    def store_many(self, items: Iterable[tuple[str, bytes]]) -> None:
+        """store all (name, value) <items>, doing multiple requests concurrently"""
+        self._map_concurrently(self.executor, lambda item: self.store(*item), items)
+
+    def delete_many(self, names: Iterable[str]) -> None:
+        """delete all <names>, doing multiple requests concurrently"""
+        self._map_concurrently(self.executor, self.delete, names)
+
     def move(self, curr_name: str, new_name: str) -> None:
         """rename curr_name to new_name (overwrite target)"""
         validate_name(curr_name)
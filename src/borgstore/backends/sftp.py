@@ -2,8 +2,8 @@
 SFTP based backend implementation - on a sftp server, use files in directories below a base path.
 """
 
+import os
 from pathlib import Path
-import random
 import re
 import stat
 from typing import Optional
@@ -19,22 +19,27 @@ from .errors import ObjectNotFound
 from ..constants import TMP_SUFFIX
 
 
-def get_sftp_backend(url):
-    # sftp://username@hostname:22/path
-    # note:
-    # - username and port optional
-    # - host must be a hostname (not IP)
-    # - must give a path, default is a relative path (usually relative to user's home dir -
-    #   this is so that the sftp server admin can move stuff around without the user needing to know).
-    # - giving an absolute path is also possible: sftp://username@hostname:22//home/username/borgstore
-    sftp_regex = r"""
+# sftp://username@hostname:22/path
+# note:
+# - username and port optional
+# - host must be a hostname (not IP)
+# - must give a path, default is a relative path (usually relative to user's home dir -
+#   this is so that the sftp server admin can move stuff around without the user needing to know).
+# - giving an absolute path is also possible: sftp://username@hostname:22//home/username/borgstore
+_URL_RE = re.compile(
+    r"""
         sftp://
         ((?P<username>[^@]+)@)?
         (?P<hostname>([^:/]+))(?::(?P<port>\d+))?/  # slash as separator, not part of the path
         (?P<path>(.+))  # path may or may not start with a slash, must not be empty
-    """
+    """,
+    re.VERBOSE,
+)
+
+
+def get_sftp_backend(url):
     if paramiko is not None:
-        m = re.match(sftp_regex, url, re.VERBOSE)
+        m = _URL_RE.match(url)
         if m:
             return Sftp(username=m["username"], hostname=m["hostname"], port=int(m["port"] or "0"), path=m["path"])
 
@@ -121,14 +126,21 @@ class Sftp(BackendBase):
 
     def destroy(self):
         def delete_recursive(path):
-            parent = Path(path)
-            for child_st in self.client.listdir_attr(str(parent)):
-                child = parent / child_st.filename
-                if stat.S_ISDIR(child_st.st_mode):
-                    delete_recursive(child)
-                else:
-                    self.client.unlink(str(child))
-            self.client.rmdir(str(parent))
+            # iterative, so deep trees can not hit the recursion limit. first delete all files while walking
+            # the tree, then remove the (now empty) directories, children before their parents.
+            dirs = []
+            todo = [str(Path(path))]
+            while todo:
+                parent = todo.pop()
+                dirs.append(parent)
+                for child_st in self.client.listdir_attr(parent):
+                    child = f"{parent}/{child_st.filename}"
+                    if stat.S_ISDIR(child_st.st_mode):
+                        todo.append(child)
+                    else:
+                        self.client.unlink(child)
+            for parent in reversed(dirs):
+                self.client.rmdir(parent)
 
         if self.opened:
             raise BackendMustNotBeOpen()
@@ -145,12 +157,13 @@ class Sftp(BackendBase):
             raise BackendMustNotBeOpen()
         self._connect()
         try:
-            st = self.client.stat(self.base_path)  # check if this storage exists, fail early if not.
+            # chdir stats base_path to check if this storage exists and is a directory, so we fail early if not.
+            # thus, we do not need an additional stat (each sftp op might be slow due to latency).
+            self.client.chdir(self.base_path)  # this sets the cwd we work in!
         except FileNotFoundError:
             raise BackendDoesNotExist(f"sftp storage base path does not exist: {self.base_path}") from None
-        if not stat.S_ISDIR(st.st_mode):
-            raise BackendDoesNotExist(f"sftp storage base path is not a directory: {self.base_path}")
-        self.client.chdir(self.base_path)  # this sets the cwd we work in!
+        except paramiko.SFTPError:  # ENOTDIR
+            raise BackendDoesNotExist(f"sftp storage base path is not a directory: {self.base_path}") from None
         self.opened = True
 
     def close(self):
@@ -228,7 +241,8 @@ class Sftp(BackendBase):
         tmp_dir = Path(name).parent
         # write to a differently named temp file in same directory first,
         # so the store never sees partially written data.
-        tmp_name = str(tmp_dir / ("".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=8)) + TMP_SUFFIX))
+        # 40 random bits as lowercase hex, much quicker than picking random letters one by one.
+        tmp_name = str(tmp_dir / (os.urandom(5).hex() + TMP_SUFFIX))
         try:
             # try to do it quickly, not doing the mkdir. each sftp op might be slow due to latency.
             # this will frequently succeed, because the dir is already there.
@@ -287,7 +301,8 @@ class Sftp(BackendBase):
         except FileNotFoundError:
             raise ObjectNotFound(name) from None
         else:
+            make_item_info = ItemInfo._make
             for info in sorted(infos, key=lambda i: i.filename):
                 if not info.filename.endswith(TMP_SUFFIX):
                     is_dir = stat.S_ISDIR(info.st_mode)
-                    yield ItemInfo(name=info.filename, exists=True, size=info.st_size, directory=is_dir)
+                    yield make_item_info((info.filename, True, info.st_size, is_dir))  # name, exists, size, directory
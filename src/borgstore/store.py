@@ -8,9 +8,9 @@ Store internally uses a backend to store k/v data and adds some functionality:
 - recursive .list method
 - soft deletion
 """
-from binascii import hexlify
 from collections import Counter
 from contextlib import contextmanager
+import itertools
 import os
 import time
 from typing import Iterator, Optional
@@ -23,6 +23,12 @@ from .backends.rclone import get_rclone_backend
 from .backends.sftp import get_sftp_backend
 from .constants import DEL_SUFFIX
 
+# all 2-digit hex directory names used for one nesting level, in sorted order.
+HEX256 = tuple(f"{i:02x}" for i in range(256))
+
+# create_levels gives this many directory names to backend.mkdir_many at once.
+MKDIR_BATCH_SIZE = 4096
+
 
 def get_backend(url):
     """parse backend URL and return a backend instance (or None)"""
@@ -64,6 +70,10 @@ class Store:
             raise ValueError("No or invalid levels configuration given.")
         # we accept levels as a dict, but we rather want a list of (namespace, levels) tuples, longest namespace first:
         self.levels = [entry for entry in sorted(levels.items(), key=lambda item: len(item[0]), reverse=True)]
+        # if all namespaces end with a slash (or are empty), the levels only depend on the namespace part of the
+        # name (everything up to the last slash), so we can remember them per namespace and avoid the prefix scan.
+        cacheable = all(ns.endswith("/") or not ns for ns, _ in self.levels)
+        self._levels_cache: Optional[dict[str, list]] = {} if cacheable else None
         if create:
             self.create_levels()
 
@@ -81,12 +91,14 @@ class Store:
                 elif level > 0:
                     # nested, we only need to create the deepest nesting dir layer,
                     # any missing parent dirs will be created as needed by backend.mkdir.
-                    limit = 2 ** (level * 8)
-                    for i in range(limit):
-                        dir = hexlify(i.to_bytes(length=level, byteorder="big")).decode("ascii")
-                        name = f"{namespace}/{dir}" if namespace else dir
-                        nested_name = nest(name, level)
-                        self.backend.mkdir(nested_name[: -2 * level - 1])
+                    # this is the same as the directory part of nest(name, level) for all possible keys, but much
+                    # quicker than computing that for each of the up to 2 ** (level * 8) directories.
+                    prefix = f"{namespace}/" if namespace else ""
+                    names = (prefix + "/".join(dirs) for dirs in itertools.product(HEX256, repeat=level))
+                    # backends might create multiple dirs concurrently, but we do not want to pass all of the
+                    # potentially millions of names at once (memory usage), thus we give them in batches.
+                    while batch := list(itertools.islice(names, MKDIR_BATCH_SIZE)):
+                        self.backend.mkdir_many(batch)
                 else:
                     raise ValueError(f"Invalid levels: {namespace}: {levels}")
 
@@ -164,6 +176,15 @@ class Store:
 
     def _get_levels(self, name):
         """get levels from configuration depending on namespace"""
+        if self._levels_cache is not None:
+            prefix = name[: name.rfind("/") + 1]
+            levels = self._levels_cache.get(prefix)
+            if levels is None:
+                levels = self._levels_cache[prefix] = self._find_levels(name)
+            return levels
+        return self._find_levels(name)
+
+    def _find_levels(self, name):
         for namespace, levels in self.levels:
             if name.startswith(namespace):
                 return levels
@@ -181,14 +202,26 @@ class Store:
 
         If deleted is True, find will try to find a "deleted" item.
         """
-        nested_name = None
         suffix = DEL_SUFFIX if deleted else None
-        for level in self._get_levels(name):
+        levels = self._get_levels(name)
+        for level in levels:
             nested_name = nest(name, level, add_suffix=suffix)
-            info = self.backend.info(nested_name)
-            if info.exists:
-                break
-        return nested_name
+            if self.backend.exists(nested_name):
+                return nested_name
+        # not found: new items go to the last level
+        return nested_name if level == levels[-1] else nest(name, levels[-1], add_suffix=suffix)
+
+    def _find_and_load(self, name, *, size, offset, deleted):
+        """same as self.backend.load(self.find(name, deleted=deleted), ...), but without the existence checks"""
+        # just try to load from each level. usually, the first try succeeds, so this saves a backend call.
+        suffix = DEL_SUFFIX if deleted else None
+        levels = self._get_levels(name)
+        for level in levels:
+            try:
+                return self.backend.load(nest(name, level, add_suffix=suffix), size=size, offset=offset)
+            except ObjectNotFound:
+                pass
+        raise ObjectNotFound(name)
 
     def info(self, name: str, *, deleted=False) -> ItemInfo:
         with self._stats_updater("info"):
@@ -196,7 +229,7 @@ class Store:
 
     def load(self, name: str, *, size=None, offset=0, deleted=False) -> bytes:
         with self._stats_updater("load"):
-            result = self.backend.load(self.find(name, deleted=deleted), size=size, offset=offset)
+            result = self._find_and_load(name, size=size, offset=offset, deleted=deleted)
             self._stats_update_volume("load", len(result))
             return result
 
@@ -266,29 +299,34 @@ class Store:
         # as the backend.list method only supports non-recursive listing and
         # also returns directories/namespaces we introduced for nesting, we do the
         # recursion here (and also we do not yield directory names from here).
-        start = time.perf_counter_ns()
+        # we sum up the time needed by the backend in a local variable and only update the stats once per
+        # backend.list call, which is much quicker than updating them per element.
+        perf_counter_ns = time.perf_counter_ns
+        start = perf_counter_ns()
         backend_list_iterator = self.backend.list(name)
         if self.latency:
             # we add the simulated latency once per backend.list iteration, not per element.
             time.sleep(self.latency)
-        end = time.perf_counter_ns()
-        self._stats["list_time"] += end - start
-        while True:
-            start = time.perf_counter_ns()
-            try:
-                info = next(backend_list_iterator)
-            except StopIteration:
-                break
-            finally:
-                end = time.perf_counter_ns()
-                self._stats["list_time"] += end - start
-            if info.directory:
-                # note: we only expect subdirectories from key nesting, but not namespaces nested into each other.
-                subdir_name = (name + "/" + info.name) if name else info.name
-                yield from self._list(subdir_name, deleted=deleted)
-            else:
-                is_deleted = info.name.endswith(DEL_SUFFIX)
-                if deleted and is_deleted:
-                    yield info._replace(name=info.name.removesuffix(DEL_SUFFIX))
-                elif not deleted and not is_deleted:
-                    yield info
+        list_time = perf_counter_ns() - start
+        try:
+            while True:
+                start = perf_counter_ns()
+                try:
+                    info = next(backend_list_iterator)
+                except StopIteration:
+                    break
+                finally:
+                    list_time += perf_counter_ns() - start
+                if info.directory:
+                    # note: we only expect subdirectories from key nesting, but not namespaces nested into each other.
+                    subdir_name = (name + "/" + info.name) if name else info.name
+                    yield from self._list(subdir_name, deleted=deleted)
+                else:
+                    is_deleted = info.name.endswith(DEL_SUFFIX)
+                    if deleted and is_deleted:
+                        yield info._replace(name=info.name.removesuffix(DEL_SUFFIX))
+                    elif not deleted and not is_deleted:
+                        yield info
+        finally:
+            # also executed if the caller stops iterating early (generator gets closed).
+            self._stats["list_time"] += list_time
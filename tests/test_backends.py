@@ -2,6 +2,8 @@
 Generic testing for the misc. backend implementations.
 """
 
+import errno
+import json
 import os
 from pathlib import Path
 
@@ -10,7 +12,7 @@ import tempfile
 
 from . import key, list_names
 
-from borgstore.backends._base import ItemInfo
+from borgstore.backends._base import ItemInfo, validate_name
 from borgstore.backends.errors import (
     BackendAlreadyExists,
     BackendDoesNotExist,
@@ -21,7 +23,7 @@ from borgstore.backends.errors import (
 from borgstore.backends.posixfs import PosixFS, get_file_backend
 from borgstore.backends.sftp import Sftp, get_sftp_backend
 from borgstore.backends.rclone import Rclone, get_rclone_backend
-from borgstore.constants import ROOTNS, TMP_SUFFIX
+from borgstore.constants import ROOTNS, TMP_SUFFIX, MAX_NAME_LENGTH
 
 
 def get_posixfs_test_backend(tmp_path):
@@ -159,6 +161,49 @@ def test_invalid_or_remote_file_url(url):
     assert backend is None
 
 
+@pytest.mark.parametrize("url", ["file:///absolute/path", "sftp://hostname/rel/path", "invalid"])
+def test_non_rclone_url(url):
+    # not a rclone URL, so this must return None (without needing a rclone binary)
+    assert get_rclone_backend(url) is None
+
+
+@pytest.mark.parametrize("use_orjson", [False, True])
+def test_rclone_rpc(use_orjson, monkeypatch):
+    # checks both json code paths of _rpc without needing a rclone binary
+    import borgstore.backends.rclone as rclone_module
+
+    orjson = pytest.importorskip("orjson") if use_orjson else None
+    monkeypatch.setattr(rclone_module, "orjson", orjson)
+
+    class Response:
+        content = b'{"list": [{"Name": "foo", "Size": 42}]}'
+
+        def json(self):
+            return json.loads(self.content)
+
+    calls = []
+
+    def requests_stub(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        return Response()
+
+    be = Rclone("remote:path")
+    be.url = "http://localhost:12345/"
+    monkeypatch.setattr(be, "_requests", requests_stub)
+    result = be._rpc("operations/list", {"fs": be.fs, "remote": "dir"})
+    assert result == {"list": [{"Name": "foo", "Size": 42}]}
+    method, url, kwargs = calls[0]
+    assert method == "post"
+    assert url == "http://localhost:12345/operations/list"
+    if use_orjson:
+        assert json.loads(kwargs["data"]) == {"fs": "remote:path/", "remote": "dir"}
+        assert kwargs["headers"] == {"Content-Type": "application/json"}
+    else:
+        # requests serializes this and sets the Content-Type header itself
+        assert kwargs["json"] == {"fs": "remote:path/", "remote": "dir"}
+        assert "data" not in kwargs and "headers" not in kwargs
+
+
 @pytest.mark.skipif(not sftp_is_available, reason="SFTP is not available")
 @pytest.mark.parametrize(
     "url,username,hostname,port,path",
@@ -189,7 +234,9 @@ def test_flat(tested_backends, request):
 
         assert sorted(backend.list(ROOTNS)) == []
 
+        assert not backend.exists(k0)
         backend.store(k0, v0)
+        assert backend.exists(k0)
         i0 = backend.info(k0)
         assert i0.exists
         assert i0.size == len(v0)
@@ -243,6 +290,8 @@ def test_namespaced(tested_backends, request):
         ins0 = backend.info(ns0)
         assert ins0.exists
         assert ins0.directory
+        assert backend.exists(ns0)
+        assert not backend.exists(ns42)
 
         backend.mkdir(ns1)
         backend.store(ns1 + "/" + k1, v1)
@@ -299,6 +348,38 @@ def test_invalid_name(tested_backends, request):
             backend.info("foo/../etc/passwd")  # ../ in path is invalid
 
 
+@pytest.mark.parametrize(
+    "name", ["", "key", "namespace/key", "data/00/01/0001cafe", "config.tmp", "ns/k-e_y.del", "x" * MAX_NAME_LENGTH]
+)
+def test_validate_name_valid(name):
+    validate_name(name)  # must not raise
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "/etc/passwd",  # absolute
+        "namespace/",  # trailing slash
+        "../etc/passwd",
+        "foo/../etc/passwd",
+        "foo..bar",
+        "back\\slash",
+        "with blank",
+        "UPPERCASE",
+        "n\xe4me",  # not ascii
+        "x" * (MAX_NAME_LENGTH + 1),
+    ],
+)
+def test_validate_name_invalid(name):
+    with pytest.raises(ValueError):
+        validate_name(name)
+
+
+def test_validate_name_type():
+    with pytest.raises(TypeError):
+        validate_name(b"bytes")
+
+
 def test_list(tested_backends, request):
     with get_backend_from_fixture(tested_backends, request) as backend:
         k0, v0 = key(0), b"value0"
@@ -352,6 +433,212 @@ def test_load_partial(tested_backends, request):
         assert backend.load("key", offset=4, size=4) == b"4567"
 
 
+def test_many(tested_backends, request):
+    with get_backend_from_fixture(tested_backends, request) as backend:
+        items = {key(i): f"value{i}".encode() for i in range(10)}
+        backend.store_many(items.items())
+        assert backend.load_many(items.keys()) == items
+        with pytest.raises(ObjectNotFound):
+            backend.load_many([key(0), key(42)])
+        backend.delete_many(list(items)[:5])
+        assert list_names(backend, ROOTNS) == sorted(items)[5:]
+        with pytest.raises(ObjectNotFound):
+            backend.delete_many([key(42)])
+        backend.mkdir_many(["dir0", "dir1/sub"])
+        assert backend.info("dir0").directory
+        assert backend.info("dir1/sub").directory
+
+
+@pytest.mark.parametrize("use_o_tmpfile", [False, True])
+def test_posixfs_store_tmpfile(posixfs_backend_created, use_o_tmpfile):
+    with posixfs_backend_created as backend:
+        if use_o_tmpfile and not backend.use_o_tmpfile:
+            # open found that unnamed temp files can't be created or linked into the store directory here.
+            pytest.skip("O_TMPFILE is not supported here")
+        backend.use_o_tmpfile = use_o_tmpfile
+        backend.store("key", b"")
+        assert backend.use_o_tmpfile == use_o_tmpfile  # no silent fallback to named temp files
+        backend.store("key", b"value")  # overwrite
+        assert backend.load("key") == b"value"
+        backend.store("namespace/key", b"value")  # missing dir
+        assert backend.load("namespace/key") == b"value"
+        # no temporary files must be left behind
+        assert sorted(os.listdir(backend.base_path)) == ["key", "namespace"]
+        assert os.listdir(backend.base_path / "namespace") == ["key"]
+
+
+def test_posixfs_o_tmpfile_probe(tmp_path, monkeypatch):
+    backend = PosixFS(tmp_path / "store")
+    backend.create()
+
+    def failing_link(*args, **kwargs):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", failing_link)
+    with backend:
+        # if linking the unnamed file fails, open decides to use named temp files.
+        assert not backend.use_o_tmpfile
+        assert os.listdir(backend.base_path) == []  # the probe leaves nothing behind
+        backend.store("key", b"value")
+        assert backend.load("key") == b"value"
+    backend.destroy()
+
+
+@pytest.mark.parametrize("dsync", [False, True])
+def test_posixfs_do_fsync(tmp_path, monkeypatch, dsync):
+    if dsync and not getattr(os, "O_DSYNC", 0):
+        pytest.skip("O_DSYNC is not available on this platform")
+    if not dsync:
+        monkeypatch.setattr("borgstore.backends.posixfs.O_DSYNC", 0)
+    backend = PosixFS(tmp_path / "store", do_fsync=True)
+    backend.create()
+    with backend:
+        backend.use_o_tmpfile = False  # exactly one open for the data file, see test_posixfs_store_tmpfile
+        write_flags, fsyncs = [], []
+        os_open, os_fsync = os.open, os.fsync
+
+        def recording_open(path, flags, *args, **kwargs):
+            if flags & os.O_WRONLY:
+                write_flags.append(flags)
+            return os_open(path, flags, *args, **kwargs)
+
+        def recording_fsync(fd):
+            fsyncs.append(fd)
+            os_fsync(fd)
+
+        monkeypatch.setattr(os, "open", recording_open)
+        monkeypatch.setattr(os, "fsync", recording_fsync)
+        backend.store("key", b"value")
+        assert len(write_flags) == 1
+        if dsync:
+            # the data file is opened with O_DSYNC, so no fsync is needed.
+            assert write_flags[0] & os.O_DSYNC
+            assert fsyncs == []
+        else:
+            assert not write_flags[0] & getattr(os, "O_DSYNC", 0)
+            assert len(fsyncs) == 1
+        assert backend.load("key") == b"value"
+        write_flags.clear()
+        fsyncs.clear()
+        # copy might use copy_file_range, which might bypass O_DSYNC, so it always uses fsync.
+        backend.copy("key", "copied")
+        assert len(write_flags) == 1 and not write_flags[0] & getattr(os, "O_DSYNC", 0)
+        assert len(fsyncs) == 1
+        assert backend.load("copied") == b"value"
+    backend.destroy()
+
+
+def test_posixfs_store_buffers(posixfs_backend_created, monkeypatch):
+    with posixfs_backend_created as backend:
+        backend.store("bytearray", bytearray(b"bytearray"))
+        assert backend.load("bytearray") == b"bytearray"
+        backend.store("memoryview", memoryview(b"memoryview"))
+        assert backend.load("memoryview") == b"memoryview"
+        # simulate partial writes:
+        write = os.write
+        monkeypatch.setattr(os, "write", lambda fd, data: write(fd, data[:3]))
+        backend.store("partial", b"0123456789")
+        assert backend.load("partial") == b"0123456789"
+
+
+def test_posixfs_load_beyond_eof(posixfs_backend_created):
+    with posixfs_backend_created as backend:
+        backend.store("key", b"0123456789")
+        assert backend.load("key", size=20) == b"0123456789"
+        assert backend.load("key", offset=8, size=5) == b"89"
+        assert backend.load("key", offset=20) == b""
+        assert backend.load("key", offset=20, size=5) == b""
+
+
+@pytest.mark.parametrize("do_fsync", [False, True])
+@pytest.mark.parametrize("fadvise_threshold", [None, 0, 5])
+def test_posixfs_fadvise(tmp_path, fadvise_threshold, do_fsync, monkeypatch):
+    assert PosixFS(tmp_path / "store").fadvise_threshold is None  # opt-in
+    backend = PosixFS(tmp_path / "store", do_fsync=do_fsync, fadvise_threshold=fadvise_threshold)
+    backend.create()
+    with backend:
+        if hasattr(os, "posix_fadvise"):
+            advice = []
+            posix_fadvise = os.posix_fadvise
+
+            def recording_fadvise(fd, offset, length, adv):
+                advice.append(adv)
+                posix_fadvise(fd, offset, length, adv)
+
+            monkeypatch.setattr(os, "posix_fadvise", recording_fadvise)
+            backend.store("key", b"0123456789")
+            # dropping written pages only works after they were synced to disk:
+            expect_dontneed = do_fsync and fadvise_threshold is not None
+            assert (os.POSIX_FADV_DONTNEED in advice) == expect_dontneed
+            advice.clear()
+            assert backend.load("key", size=3) == b"012"
+            assert advice == []  # partial loads are not advised
+            assert backend.load("key") == b"0123456789"
+            if fadvise_threshold is None:
+                assert advice == []
+            else:
+                assert advice == [os.POSIX_FADV_SEQUENTIAL, os.POSIX_FADV_DONTNEED]
+        backend.store("key", b"0123456789")
+        assert backend.load("key") == b"0123456789"
+        assert backend.load("key", size=3) == b"012"
+        assert backend.load("key", offset=4, size=6) == b"456789"
+    backend.destroy()
+
+
+def test_posixfs_load_directory(posixfs_backend_created):
+    with posixfs_backend_created as backend:
+        backend.mkdir("dir")
+        for kwargs in {}, dict(size=0), dict(offset=1000000), dict(size=10, offset=1000000):
+            with pytest.raises(IsADirectoryError):
+                backend.load("dir", **kwargs)
+
+
+def test_posixfs_copy(posixfs_backend_created, monkeypatch):
+    with posixfs_backend_created as backend:
+        value = bytes(range(256)) * 10000
+        backend.store("key", value)
+        backend.copy("key", "namespace/copied")  # also creates missing dirs
+        assert backend.load("namespace/copied") == value
+        assert backend.load("key") == value
+        # without copy_file_range, the data is copied via read / write:
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+        backend.store("key", b"other value")
+        backend.copy("key", "namespace/copied")  # overwrite target
+        assert backend.load("namespace/copied") == b"other value"
+        with pytest.raises(ObjectNotFound):
+            backend.copy("nonexistent", "target")
+
+
+def test_posixfs_info_cache(tmp_path):
+    backend = PosixFS(tmp_path / "store", info_cache_size=2)
+    backend.create()
+    with backend:
+        backend.store("key", b"value")
+        assert backend.info("key").size == 5
+        backend.store("key", b"other value")  # invalidates
+        assert backend.info("key").size == 11
+        backend.copy("key", "copied")
+        assert backend.info("copied").size == 11
+        backend.move("key", "moved")
+        assert not backend.exists("key")
+        assert backend.info("moved").size == 11
+        backend.delete("moved")
+        assert not backend.info("moved").exists
+        backend.store("namespace/key", b"value")
+        assert backend.exists("namespace/key")
+        backend.move("namespace", "renamed")
+        assert not backend.exists("namespace/key")
+        assert backend.exists("renamed/key")
+        assert len(backend._info_cache) <= 2
+        # changes done by others are not noticed while cached:
+        assert backend.info("copied").exists
+        os.unlink(backend.base_path / "copied")
+        assert backend.info("copied").exists
+    with backend:
+        assert not backend.info("copied").exists  # cache was cleared by close
+    backend.destroy()
+
+
 def test_already_exists(tested_backends, request):
     backend = get_backend_from_fixture(tested_backends, request)
     with backend as _backend:
@@ -386,6 +673,8 @@ def test_must_be_open(tested_backends, request):
         backend.load("key")
     with pytest.raises(BackendMustBeOpen):
         backend.info("key")
+    with pytest.raises(BackendMustBeOpen):
+        backend.exists("key")
     with pytest.raises(BackendMustBeOpen):
         backend.move("key", "otherkey")
     with pytest.raises(BackendMustBeOpen):
@@ -10,7 +10,7 @@ from .test_backends import get_sftp_test_backend, sftp_is_available  # noqa
 from .test_backends import get_rclone_test_backend, rclone_is_available  # noqa
 
 from borgstore.constants import ROOTNS
-from borgstore.store import Store, ItemInfo
+from borgstore.store import Store, ItemInfo, ObjectNotFound
 
 LEVELS_CONFIG = {"zero/": [0], "one/": [1], "two/": [2]}  # this is the layout we use for most tests
 
@@ -197,6 +197,37 @@ def test_downgrade_levels(posixfs_store_created):
         assert store.load(k1) == v1new
 
 
+def test_find_levels_order(posixfs_store_created):
+    k0 = key(0)
+    posixfs_store_created.set_levels({ROOTNS: [0, 1]}, create=True)
+    with posixfs_store_created as store:
+        store.store(k0, b"level1")  # new item, stored on the last level
+        assert store.find(k0) == "00/" + k0
+        assert store.load(k0) == b"level1"
+        store.backend.store(k0, b"level0")  # now there is also a copy on level 0
+        # the first configured level wins, no matter what was found before:
+        assert store.find(k0) == k0
+        assert store.load(k0) == b"level0"
+
+
+def test_load_levels(posixfs_store_created, monkeypatch):
+    k0, v0 = key(0), b"value0"
+    k1, v1 = key(1), b"value1"
+    posixfs_store_created.set_levels({ROOTNS: [0, 1]}, create=True)
+    with posixfs_store_created as store:
+        store.store(k1, v1)  # new item, stored on the last level
+        store.backend.store(k0, v0)  # item on level 0
+        # load does not need to check for existence, it just tries the levels:
+        monkeypatch.setattr(store.backend, "exists", None)
+        assert store.load(k0) == v0
+        assert store.load(k1) == v1
+        assert store.load(k1, offset=1, size=4) == v1[1:5]
+        with pytest.raises(ObjectNotFound):
+            store.load(key(42))
+        with pytest.raises(ObjectNotFound):
+            store.load(k0, deleted=True)
+
+
 def test_move_delete_undelete(posixfs_store_created):
     ns = "zero"
     k0, v0 = key(0), b"value0"
@@ -254,6 +285,29 @@ def test_nesting_config(posixfs_store_created):
         assert store.find("two/12345678") == "two/12/34/12345678"
 
 
+@pytest.mark.parametrize(
+    "levels",
+    [
+        {"data/": [1], "data/sub/": [2], "": [0]},  # all namespaces end with a slash, levels are cached
+        {"data": [1], "datasub": [2], "": [0]},  # namespaces without slash, levels are looked up for each name
+    ],
+)
+def test_get_levels(tmp_path, levels):
+    store = Store(backend=get_posixfs_test_backend(tmp_path), levels=levels)
+    for _ in range(2):  # second round: cached, if possible
+        assert store._get_levels("data/1234") == [1]
+        assert store._get_levels("key") == [0]
+    if "data/sub/" in levels:
+        assert store._get_levels("data/sub/1234") == [2]
+    else:
+        assert store._get_levels("datasub/1234") == [2]
+        assert store._get_levels("datasub") == [2]
+    store = Store(backend=get_posixfs_test_backend(tmp_path), levels={"data/": [1]})
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            store._get_levels("other/1234")
+
+
 def test_load_partial(posixfs_store_created):
     key = "zero/key"
     with posixfs_store_created as store: